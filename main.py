@@ -9,48 +9,51 @@ from telegram import Update
 
 import asyncio
 
-from src.services.database import AdminTypes, UserType
+from src.services.database import ADMIN_MASTER, USER_BANNED
 from src.services.database_manager import DatabaseManager
-from src.services.database import AdminTypes
 from src.utils.formatters import TelegramFormatter
+from src.utils.helpers import get_telegram_id
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Create shared user_states dictionary
-user_states = {}
-
-# Initialize handlers
-analysis_handler = AnalysisHandler()
-callback_handler = CallbackHandler()
-message_handler = CustomMessageHandler()  # Updated class name
 keyboards = AnalysisKeyboards()
 formatter = TelegramFormatter()
-db = DatabaseManager()
-db.init_db()
 
-# Share user_states between handlers
-callback_handler.user_states = user_states
-message_handler.user_states = user_states
+# Plain text messages that are not commands go to the message handler
+TEXT_NON_COMMAND_FILTER = filters.TEXT & ~filters.COMMAND
 
+def build_menus(build_menu):
+    """Build one keyboard per supported language."""
+    current_language = formatter.current_language
+    menus = {}
+    for lang_code in formatter.languages:
+        formatter.set_language(lang_code)
+        menus[lang_code] = build_menu()
+    formatter.set_language(current_language)
+    return menus
 
+# Markups only depend on the language, so build them once and reuse them
+MAIN_MENUS = build_menus(keyboards.get_main_menu)
+ADMIN_MENUS = build_menus(keyboards.get_admin_menu)
+# Created in main() so importing this module has no database side effects
+db = None
 
 
 async def start_command(update, context):
-    user = db.get_user_by_telegram_id(str(update.message.from_user.username))
-    
-    if not user:
-        db.create_user({'telegram_id':str(update.message.from_user.username)})
-        user = db.get_user_by_telegram_id(str(update.message.from_user.username))
-   
+    tg_id = get_telegram_id(update.message.from_user)
+    user = await asyncio.to_thread(db.get_or_create_user, tg_id)
+
     formatter.set_language(user['language'])
-    print(user['telegram_id'])
-    if user["user_type"] == UserType.BANNED:
+    logger.debug("tg_id=%s", tg_id)
+    if user["user_type"] == USER_BANNED:
         return await update.message.reply_text(
         formatter._t('error_no_permission'))
-    formatter.set_language(user['language'])
 
 
     
@@ -63,20 +66,18 @@ async def start_command(update, context):
     )
     await update.message.reply_text(
         formatter._t('welcome_text'),
-        reply_markup=keyboards.get_main_menu()
+        reply_markup=MAIN_MENUS[formatter.current_language]
     )  
   
 
 async def admin_command(update,context):
-    create_first_admins(["abualmun","osmanoor2018","hooibi"])
+    tg_id = get_telegram_id(update.message.from_user)
 
-    # db.update_admin_role(str(update.message.from_user.username),AdminTypes.MASTER,str(update.message.from_user.username))
+    # db.update_admin_role(tg_id,ADMIN_MASTER,tg_id)
     # db.sync_with_api(api)
-    user = db.get_user_by_telegram_id(str(update.message.from_user.username))
-    if not user:
-        db.create_user({'telegram_id':str(update.message.from_user.username)})
+    user = await asyncio.to_thread(db.get_or_create_user, tg_id)
     try:
-        admin = db.get_admin_by_user_id(user["telegram_id"])
+        admin = await asyncio.to_thread(db.get_admin_by_user_id, user["telegram_id"])
         formatter.set_language(user['language'])
 
         if admin and admin['is_active']:
@@ -87,38 +88,40 @@ async def admin_command(update,context):
                 )
             await update.message.reply_text(
                 welcome_text,
-                reply_markup=keyboards.get_admin_menu()
+                reply_markup=ADMIN_MENUS[formatter.current_language]
             )
         else:
             await update.message.reply_text(
                 formatter._t("not_authorized")
             )
     except Exception as e:
-        print(e)
-        pass
+        logger.error("admin_command failed for %s: %s", tg_id, e)
+
+# Every progress bar frame, from 0% to 100% in 5% steps (20 is the bar length)
+PROGRESS_FRAMES = tuple(f"Loading: [{'█' * i}{' ' * (20 - i)}] {i * 5}%" for i in range(21))
+# Frames actually sent to Telegram: 0/25/50/75/100%
+PROGRESS_STEP = 5
+PROGRESS_UPDATES = PROGRESS_FRAMES[::PROGRESS_STEP]
 
 async def progress_bar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Simulates a loading progress bar in the bot."""
-    message = await update.message.reply_text("Loading: [                    ] 0%")
-    progress = 0
+    message = await update.message.reply_text(PROGRESS_UPDATES[0])
+    pending_edit = None
     
-    while progress <= 100:
-        # Generate the progress bar
-        filled_length = int(20 * progress / 100)  # 20 is the bar length
-        bar = "█" * filled_length + " " * (20 - filled_length)
-        
-        # Edit the message with the new progress
-        await message.edit_text(f"Loading: [{bar}] {progress}%")
-        
-        # Increment progress and wait
-        progress += 5
-        await asyncio.sleep(0.2)  # Simulate work being done
+    for frame in PROGRESS_UPDATES[1:]:
+        await asyncio.sleep(0.2 * PROGRESS_STEP)  # Simulate work being done
+        # Keep edits ordered, but let each request overlap with the next sleep
+        if pending_edit:
+            await pending_edit
+        pending_edit = asyncio.create_task(message.edit_text(frame))
     
+    if pending_edit:
+        await pending_edit
     # Final message when complete
     await message.edit_text("✅ Loading Complete!")
 
 async def print_id(update,context):
-    await update.message.reply_text(update.message.from_user.username)
+    await update.message.reply_text(get_telegram_id(update.message.from_user))
 # Create the bot application
 # async def main():
 #     application = (
@@ -129,38 +132,68 @@ async def print_id(update,context):
 
 #     # Start the bot
 #     await application.run_polling()
+ADMINS = ["abualmun","osmanoor2018","hooibi"]
+
 def create_first_admins(admins):
-    for admin_name in admins:
-        new_admin = db.get_admin_by_user_id(admin_name)
-        if not new_admin:
-            user = db.get_user_by_telegram_id(admin_name)
-            if not user:    
-                db.create_user({'telegram_id':admin_name})
-            new_admin = db.create_admin({'user_id':admin_name,'role':AdminTypes.MASTER,'created_by':"abualmun"})
+    db.bootstrap_admins(admins, created_by="abualmun", role=ADMIN_MASTER)
 
 
-def main():
+async def on_startup(application):
+    """Create the database tables and the first admins once the application has started."""
+    await asyncio.to_thread(db.init_db)
+    await asyncio.to_thread(create_first_admins, ADMINS)
 
 
-    
+def setup_logging():
+    """Route log records through a queue so the handlers write from a background thread."""
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    for handler in handlers:
+        root.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    root.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
 
- 
+
+def main():
     """Main function to run the bot"""
+    log_listener = setup_logging()
+    global db
+    db = DatabaseManager()
+
+    # Initialize handlers
+    analysis_handler = AnalysisHandler()
+    callback_handler = CallbackHandler()
+    message_handler = CustomMessageHandler()  # Updated class name
+
+    # Share user_states between handlers
+    user_states = {}
+    callback_handler.user_states = user_states
+    message_handler.user_states = user_states
+
     # Create application
-    application = Application.builder().token(os.getenv("TELEGRAM_BOT_TOKEN")).build()
+    application = (
+        Application.builder()
+        .token(os.getenv("TELEGRAM_BOT_TOKEN"))
+        .post_init(on_startup)
+        .build()
+    )
 
     # Add command handlers
-    application.add_handler(CommandHandler('start', start_command))
-    application.add_handler(CommandHandler('analyze', analysis_handler.cmd_analyze))
-    application.add_handler(CommandHandler('quick', analysis_handler.cmd_quick))
-    application.add_handler(CommandHandler('news', analysis_handler.cmd_news))
-    application.add_handler(CommandHandler('chart', analysis_handler.cmd_chart))
-    application.add_handler(CommandHandler('admin', admin_command))
-# DEBUGGING
-    application.add_handler(CommandHandler('id', print_id))
-    
-    # Add the command handler
-    application.add_handler(CommandHandler("progress", progress_bar))
+    commands = (
+        ('start', start_command),
+        ('analyze', analysis_handler.cmd_analyze),
+        ('quick', analysis_handler.cmd_quick),
+        ('news', analysis_handler.cmd_news),
+        ('chart', analysis_handler.cmd_chart),
+        ('admin', admin_command),
+        ('id', print_id),  # DEBUGGING
+        ('progress', progress_bar),
+    )
+    for name, callback in commands:
+        application.add_handler(CommandHandler(name, callback))
 
     # Add callback handler for keyboard interactions
     application.add_handler(CallbackQueryHandler(callback_handler.handle_callback))
@@ -168,21 +201,19 @@ def main():
     # Add message handler for text inputs - Fixed handler
     application.add_handler(
         MessageHandler(
-            filters.TEXT & ~filters.COMMAND,
+            TEXT_NON_COMMAND_FILTER,
             message_handler.handle_message,
         )
     )
 
     # Start the bot
-    print('Starting bot...')
-    application.run_polling()
-    
-    
-    
-    # add admin then comment again
+    logger.info('Starting bot...')
+    try:
+        application.run_polling()
+    finally:
+        log_listener.stop()
 
 
 # Run the bot
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -7,6 +7,7 @@ from src.services.database_manager import DatabaseManager
 from ...analysis.technical import TechnicalAnalyzer
 from ...utils.formatters import TelegramFormatter
 from ...utils.news_formatters import NewsFormatter
+from ...utils.helpers import get_telegram_id
 from ...data.processor import DataProcessor
 import asyncio
 from ...data.cc_news import CryptoNewsFetcher
@@ -128,7 +129,7 @@ class AnalysisHandler:
     )
             # log the activities in the database
             self.db_manager.log_user_activity({
-                'user_id':update.message.from_user.username,
+                'user_id':get_telegram_id(update.message.from_user),
                 'coin_id':coin_id,
                 'activity_type':'full',
                 'timestamp':days}) 
@@ -141,7 +142,7 @@ class AnalysisHandler:
 
     async def cmd_quick(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         self.formatter.set_language(context.user_data['language'])
-        user = self.db_manager.get_user_by_telegram_id(update.message.from_user.username)
+        user = self.db_manager.get_user_by_telegram_id(get_telegram_id(update.message.from_user))
         preferred_chart_type = user["preferred_chart_type"]
         preferred_timeframe = user["preferred_timeframe"]
         """Handler for /quick command"""
@@ -189,7 +190,7 @@ class AnalysisHandler:
             # log the activities in the database
 
             self.db_manager.log_user_activity({
-                'user_id':update.message.from_user.username,
+                'user_id':get_telegram_id(update.message.from_user),
                 'coin_id':coin_id,
                 'activity_type':'price',
                 'timestamp':1})
@@ -241,7 +242,7 @@ class AnalysisHandler:
             )
             # log the activities in the database
             self.db_manager.log_user_activity({
-                'user_id':update.message.from_user.username,
+                'user_id':get_telegram_id(update.message.from_user),
                 'coin_id':coin_id,
                 'activity_type':chart_type,
                 'timestamp':days})
@@ -2,11 +2,12 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
-from src.services.database import AdminTypes, UserType
+from src.services.database import ADMIN_MASTER, ADMIN_NORMAL, ADMIN_WATCHER, USER_BANNED, USER_GUEST, USER_PREMIUM
 from src.services.database_manager import DatabaseManager
 from ..keyboards.reply_keyboards import AnalysisKeyboards
 from .analysis_handlers import AnalysisHandler
 from ...utils.formatters import TelegramFormatter
+from ...utils.helpers import get_telegram_id
 
 
 class CallbackHandler:
@@ -19,7 +20,7 @@ class CallbackHandler:
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle callback queries from inline keyboards"""
         query = update.callback_query
-        user_id = str(update.effective_user.username)
+        user_id = get_telegram_id(update.effective_user)
         data = query.data
         
         if 'language' not in context.user_data:
@@ -90,7 +91,7 @@ class CallbackHandler:
     # _handle_back_button, _handle_help_selection.
     async def _handle_menu_selection(self, query, user_id,context):
         user = self.db_manager.get_user_by_telegram_id(user_id)
-        if user["user_type"] == UserType.BANNED:
+        if user["user_type"] == USER_BANNED:
             return await query.edit_message_text(
             self.formatter._t('error_no_permission'))
         
@@ -136,7 +137,7 @@ class CallbackHandler:
 
     async def _handle_analysis_selection(self, query,context, user_id):
         user = self.db_manager.get_user_by_telegram_id(user_id)
-        if user["user_type"] == UserType.BANNED:
+        if user["user_type"] == USER_BANNED:
             return await query.edit_message_text(
             self.formatter._t('error_no_permission'))
         
@@ -361,7 +362,7 @@ class CallbackHandler:
                 reply_markup=self.keyboards.get_user_tracking_menu()
             )
         elif action == "users":
-            if admin_role == AdminTypes.WATCHER:
+            if admin_role == ADMIN_WATCHER:
                 await query.edit_message_text(
                     self.formatter._t('not_authorized'),
                     reply_markup=self.keyboards.get_admin_menu()
@@ -372,7 +373,7 @@ class CallbackHandler:
                     reply_markup=self.keyboards.get_users_managing_menu()
                 )
         elif action == "admins":
-            if admin_role == AdminTypes.MASTER:
+            if admin_role == ADMIN_MASTER:
                 await query.edit_message_text(
                     self.formatter._t('select_admin_management_option'),
                     reply_markup=self.keyboards.get_admins_managing_menu()
@@ -503,14 +504,14 @@ class CallbackHandler:
     async def _handle_user_ban(self,query,context,user_id):
             
             admin = self.db_manager.get_admin_by_user_id(user_id)
-            if not admin or admin['role'] == AdminTypes.WATCHER:
+            if not admin or admin['role'] == ADMIN_WATCHER:
                 return await query.edit_message_text(
                         self.formatter._t('error_no_permission'))
             target_id = str(context.user_data["target_id"])
 
             user = self.db_manager.get_user_by_telegram_id(str(target_id))
             if user:
-                success = self.db_manager.update_user_type(target_id,new_type=UserType.BANNED,admin_id=user_id)
+                success = self.db_manager.update_user_type(target_id,new_type=USER_BANNED,admin_id=user_id)
                 if success:
                     await query.edit_message_text(
                     f"{self.formatter._t('success_user_banned')}",
@@ -525,14 +526,14 @@ class CallbackHandler:
                     self.formatter._t('error_user_not_found'))
     async def _handle_change_user_subscrption(self,query,context,user_id):
         admin = self.db_manager.get_admin_by_user_id(user_id)
-        if not admin or admin['role'] == AdminTypes.WATCHER:
+        if not admin or admin['role'] == ADMIN_WATCHER:
             return await query.edit_message_text(
                     self.formatter._t('error_no_permission'))
         subscription = query.data.split("_")[-1]
         if subscription == 'premium':
-            subscription = UserType.PREMIUM
+            subscription = USER_PREMIUM
         if subscription == 'guest':
-            subscription = UserType.GUEST
+            subscription = USER_GUEST
         target_id = str(context.user_data["target_id"])
         user = self.db_manager.get_user_by_telegram_id(target_id)
         if user:
@@ -551,7 +552,7 @@ class CallbackHandler:
 
     async def _handle_admin_remove(self,query,context,user_id):
             admin = self.db_manager.get_admin_by_user_id(user_id)
-            if not admin or admin['role'] != AdminTypes.MASTER:
+            if not admin or admin['role'] != ADMIN_MASTER:
                 return await query.edit_message_text(
                         self.formatter._t('error_no_permission'))
             
@@ -573,7 +574,7 @@ class CallbackHandler:
 
     async def _handle_admin_add(self,query,context,user_id):
             admin = self.db_manager.get_admin_by_user_id(user_id)
-            if not admin or admin['role'] != AdminTypes.MASTER:
+            if not admin or admin['role'] != ADMIN_MASTER:
                 return await query.edit_message_text(
                         self.formatter._t('error_no_permission'))
             
@@ -581,7 +582,7 @@ class CallbackHandler:
             target_id = str(context.user_data["target_id"])
             check_admin = self.db_manager.get_admin_by_user_id(target_id)
             if not check_admin:
-                success = self.db_manager.create_admin({'user_id' : target_id,"role":AdminTypes.NORMAL,"created_by":user_id})
+                success = self.db_manager.create_admin({'user_id' : target_id,"role":ADMIN_NORMAL,"created_by":user_id})
                 if success:
                     await query.edit_message_text(
                     f"{self.formatter._t('success_admin_added')}",
@@ -596,14 +597,14 @@ class CallbackHandler:
     async def _handle_change_admin_role(self,query,context,user_id):
         role = query.data.split("_")[-1]
         if role == 'master':
-            role = AdminTypes.MASTER
+            role = ADMIN_MASTER
         if role == 'normal':
-            role = AdminTypes.NORMAL
+            role = ADMIN_NORMAL
         if role == "watcher":
-            role = AdminTypes.WATCHER
+            role = ADMIN_WATCHER
         # check if the chager has authoroity to do this
         admin = self.db_manager.get_admin_by_user_id(user_id)
-        if admin['role'] != AdminTypes.MASTER:
+        if admin['role'] != ADMIN_MASTER:
             return await query.edit_message_text(
             f"{self.formatter._t('not_authorized')}")
         
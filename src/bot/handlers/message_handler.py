@@ -7,6 +7,7 @@ from src.services.database_manager import DatabaseManager
 from .analysis_handlers import AnalysisHandler
 from ...llm.agent import CryptoAnalysisAgent
 from ...utils.formatters import TelegramFormatter
+from ...utils.helpers import get_telegram_id
 
 
 class CustomMessageHandler:  # Renamed from MessageHandler to CustomMessageHandler
@@ -18,7 +19,7 @@ class CustomMessageHandler:  # Renamed from MessageHandler to CustomMessageHandl
         self.keyboards = AnalysisKeyboards()
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages"""
-        user_id = str(update.effective_user.username)
+        user_id = get_telegram_id(update.effective_user)
         text = update.message.text.lower()
 
         # Set language from context
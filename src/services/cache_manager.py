@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import select
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import logging
 from typing import Optional, Dict, List
@@ -45,7 +45,7 @@ class CacheManager:
         session = self.Session()
         try:
             cache_duration = self.cache_duration.get(interval, 300)
-            cache_threshold = datetime.utcnow() - timedelta(seconds=cache_duration)
+            cache_threshold = datetime.now(timezone.utc) - timedelta(seconds=cache_duration)
             
             query = (
                 select(OHLC)  # Changed from CryptoOHLCV to OHLC
@@ -132,7 +132,7 @@ class CacheManager:
                     existing.close = row['close']
                     existing.volume = volume
                     existing.market_cap = market_cap
-                    existing.last_updated = datetime.utcnow()
+                    existing.last_updated = datetime.now(timezone.utc)
                 else:
                     # Create new record
                     new_record = OHLC(
@@ -146,7 +146,7 @@ class CacheManager:
                         close=row['close'],
                         volume=volume,
                         market_cap=market_cap,
-                        last_updated=datetime.utcnow()
+                        last_updated=datetime.now(timezone.utc)
                     )
                     session.add(new_record)
             
@@ -170,7 +170,7 @@ class CacheManager:
                 existing.name = coin_data.get('name')
                 existing.platforms = coin_data.get('platforms', {})
                 existing.extra_data = coin_data
-                existing.last_updated = datetime.utcnow()
+                existing.last_updated = datetime.now(timezone.utc)
             else:
                 entry = Coin(
                     id=coin_data['id'],
@@ -178,7 +178,7 @@ class CacheManager:
                     name=coin_data.get('name'),
                     platforms=coin_data.get('platforms', {}),
                     extra_data=coin_data,
-                    last_updated=datetime.utcnow()
+                    last_updated=datetime.now(timezone.utc)
                 )
                 session.add(entry)
             
@@ -195,7 +195,7 @@ class CacheManager:
         """Get coin metadata from cache if available and not expired."""
         session = self.Session()
         try:
-            cache_threshold = datetime.utcnow() - timedelta(seconds=self.cache_duration[30])
+            cache_threshold = datetime.now(timezone.utc) - timedelta(seconds=self.cache_duration[30])
             
             result = session.query(Coin).filter(
                 Coin.id == coin_id,
@@ -247,7 +247,7 @@ class CacheManager:
                     existing.name = coin.get('name')
                     existing.platforms = coin.get('platforms', {})
                     existing.extra_data = coin
-                    existing.last_updated = datetime.utcnow()
+                    existing.last_updated = datetime.now(timezone.utc)
                 else:
                     entry = Coin(
                         id=coin['id'],
@@ -255,7 +255,7 @@ class CacheManager:
                         name=coin.get('name'),
                         platforms=coin.get('platforms', {}),
                         extra_data=coin,
-                        last_updated=datetime.utcnow()
+                        last_updated=datetime.now(timezone.utc)
                     )
                     session.add(entry)
             
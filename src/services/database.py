@@ -1,18 +1,53 @@
-from sqlalchemy import Boolean, create_engine, Column, Integer, String, Float, JSON, DateTime, ForeignKey, UniqueConstraint, Enum
+from sqlalchemy import Boolean, create_engine, event, inspect, make_url, text, Column, Integer, SmallInteger, String, Float, JSON, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from datetime import datetime
+from sqlalchemy.orm import relationship, scoped_session, sessionmaker
+from sqlalchemy.types import TypeDecorator, Enum as EnumType
+from sqlalchemy.pool import NullPool, StaticPool
+from datetime import datetime, timezone
 import enum
 
 # Create base class for declarative models
 Base = declarative_base()
 
-class TimeInterval(enum.Enum):
+def _utcnow():
+    """Timezone-aware current UTC time, used for column defaults."""
+    return datetime.now(timezone.utc)
+
+class UTCDateTime(TypeDecorator):
+    """Timestamp stored as naive UTC and always loaded as a timezone-aware UTC datetime."""
+    # Naive, like the existing columns, so PostgreSQL keeps its
+    # timestamp without time zone columns and compares them as UTC
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc)
+
+class TimeInterval(enum.IntEnum):
     ONE_DAY = 1
     SEVEN_DAYS = 7
     THIRTY_DAYS = 30
     NINETY_DAYS = 90
 
+class IntervalColumn(TypeDecorator):
+    """SmallInteger holding a TimeInterval value."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        # SQLite keeps the text affinity of the old Enum column, so migrated rows load as '1'
+        return None if value is None else int(value)
+
 class Coin(Base):
     """Model for storing basic cryptocurrency information."""
     __tablename__ = 'coins'
@@ -22,7 +57,7 @@ class Coin(Base):
     name = Column(String, nullable=False)  # e.g., "Bitcoin"
     platforms = Column(JSON)
     extra_data = Column(JSON)
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_updated = Column(UTCDateTime, default=_utcnow, onupdate=_utcnow)
 
     # Relationships
     prices = relationship("CoinPrice", back_populates="coin", cascade="all, delete-orphan")
@@ -43,7 +78,7 @@ class CoinPrice(Base):
     market_cap = Column(Float)
     volume_24h = Column(Float)
     price_change_24h = Column(Float)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(UTCDateTime, default=_utcnow)
 
     # Relationship
     coin = relationship("Coin", back_populates="prices")
@@ -61,7 +96,7 @@ class OHLC(Base):
     id = Column(Integer, primary_key=True)
     coin_id = Column(String, ForeignKey('coins.id', ondelete='CASCADE'), nullable=False)
     vs_currency = Column(String, nullable=False)
-    interval = Column(Enum(TimeInterval), nullable=False)
+    interval = Column(IntervalColumn, nullable=False)  # TimeInterval value
     timestamp = Column(DateTime, nullable=False)
     open = Column(Float)
     high = Column(Float)
@@ -69,13 +104,17 @@ class OHLC(Base):
     close = Column(Float)
     volume = Column(Float)
     market_cap = Column(Float)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(UTCDateTime, default=_utcnow)
 
     # Relationship
     coin = relationship("Coin", back_populates="ohlc_data")
 
-    # Unique constraint for coin_id and timestamp combination
-    __table_args__ = (UniqueConstraint('coin_id', 'timestamp', name='unique_coin_timestamp'),)
+    # Unique constraint for coin_id and timestamp combination, plus an index
+    # matching the cache lookup (coin, currency, interval, time range)
+    __table_args__ = (
+        UniqueConstraint('coin_id', 'timestamp', name='unique_coin_timestamp'),
+        Index('ix_ohlc_lookup', 'coin_id', 'vs_currency', 'interval', 'timestamp'),
+    )
 
     def __repr__(self):
         return f"<OHLC(coin_id={self.coin_id}, timestamp={self.timestamp}, close={self.close})>"
@@ -90,7 +129,7 @@ class TrendingCoin(Base):
     score = Column(Float)
     market_cap = Column(Float)
     thumb = Column(String)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(UTCDateTime, default=_utcnow)
 
     # Relationship
     coin = relationship("Coin", back_populates="trending_data")
@@ -101,20 +140,25 @@ class TrendingCoin(Base):
     def __repr__(self):
         return f"<TrendingCoin(coin_id={self.coin_id}, rank={self.rank}, score={self.score})>"
 
-class UserType(enum.Enum):
+class UserType(str, enum.Enum):
     GUEST = "guest"
     PREMIUM = "premium"
     BANNED = "banned"    
 
+# user_type values as stored in the users table
+USER_GUEST = UserType.GUEST.value
+USER_PREMIUM = UserType.PREMIUM.value
+USER_BANNED = UserType.BANNED.value
+
 class User(Base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
     telegram_id = Column(String, unique=True, nullable=False)
     username = Column(String)
-    user_type = Column(Enum(UserType), default=UserType.GUEST, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_active = Column(DateTime, default=datetime.utcnow)
+    user_type = Column(String(8), default=USER_GUEST, nullable=False)
+    created_at = Column(UTCDateTime, default=_utcnow)
+    last_active = Column(UTCDateTime, default=_utcnow)
     language = Column(String, default='en')
     preferred_chart_type = Column(String, default='price')
     preferred_timeframe = Column(Integer, default=30)
@@ -135,19 +179,24 @@ class UserActivity(Base):
     # Relationship
     user = relationship("User", back_populates="activities")
 
-class AdminTypes(enum.Enum):
+class AdminTypes(str, enum.Enum):
     MASTER = "master"
     NORMAL = "normal"
     WATCHER = "watcher"
 
+# role values as stored in the admins table
+ADMIN_MASTER = AdminTypes.MASTER.value
+ADMIN_NORMAL = AdminTypes.NORMAL.value
+ADMIN_WATCHER = AdminTypes.WATCHER.value
+
 class Admin(Base):
     __tablename__ = 'admins'
     
     
     id = Column(Integer, primary_key=True)
     user_id = Column(String, ForeignKey('users.telegram_id', ondelete='CASCADE'),unique=True, nullable=False)
-    role = Column(Enum(AdminTypes), default=AdminTypes.NORMAL, nullable=False) 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    role = Column(String(8), default=ADMIN_NORMAL, nullable=False) 
+    created_at = Column(UTCDateTime, default=_utcnow)
     created_by = Column(String, ForeignKey('admins.user_id'))
     is_active = Column(Boolean, default=True)
     
@@ -162,16 +211,112 @@ class AdminActivity(Base):
     admin_id = Column(String, ForeignKey('admins.user_id', ondelete='CASCADE'), nullable=False)
     activity_type = Column(String, nullable=False)  # 'user_update', 'admin_add', etc.
     target_user_id = Column(String, ForeignKey('users.telegram_id'))  # Affected user if any
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(UTCDateTime, default=_utcnow)
     details = Column(JSON)  # Store activity details
     
     # Relationships
     admin = relationship("Admin", back_populates="activities")
     target_user = relationship("User")
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Switch every new SQLite connection to WAL journaling."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def _is_sqlite_memory(database_url):
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and (
+        url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+    )
+
+def create_db_engine(database_url, use_null_pool=False):
+    """
+    Create a pooled engine; SQLite connections are tuned for concurrent reads.
+    Pass use_null_pool=True behind an external pooler such as PgBouncer.
+    """
+    if use_null_pool:
+        engine = create_engine(database_url, poolclass=NullPool)
+    elif _is_sqlite_memory(database_url):
+        # In-memory SQLite lives in its connection, so every thread (the bot
+        # runs queries through asyncio.to_thread) must share that one connection
+        engine = create_engine(
+            database_url,
+            poolclass=StaticPool,
+            connect_args={'check_same_thread': False},
+        )
+    else:
+        # pre_ping/recycle replace connections the server dropped while idle
+        engine = create_engine(
+            database_url,
+            pool_size=10,
+            max_overflow=5,
+            pool_timeout=30,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
+
+def create_missing_indexes(engine):
+    """Add declared indexes to tables that already existed before they were declared."""
+    # create_all() skips existing tables entirely, including their new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+# Columns that used to be Enum(...) types, which stored member names ('BANNED', 'ONE_DAY')
+LEGACY_ENUM_COLUMNS = (
+    ('users', 'user_type', UserType, 'VARCHAR(8)'),
+    ('admins', 'role', AdminTypes, 'VARCHAR(8)'),
+    ('ohlc', 'interval', TimeInterval, 'SMALLINT'),
+)
+
+def migrate_legacy_enums(engine):
+    """Rewrite enum member names left by the old Enum columns into the stored values."""
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        legacy_types = set()
+        for table, column, enum_cls, sql_type in LEGACY_ENUM_COLUMNS:
+            column_type = next(
+                col['type'] for col in inspector.get_columns(table) if col['name'] == column
+            )
+            cases = ' '.join(
+                f"WHEN '{member.name}' THEN '{member.value}'" for member in enum_cls
+            )
+            if engine.dialect.name == 'postgresql':
+                # Native enum types reject the new values, so convert the column itself
+                if isinstance(column_type, EnumType):
+                    connection.execute(text(
+                        f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} TYPE {sql_type} "
+                        f"USING CAST(CASE {quote(column)}::text {cases} END AS {sql_type})"
+                    ))
+                    legacy_types.add(column_type.name)
+            else:
+                names = ', '.join(f"'{member.name}'" for member in enum_cls)
+                connection.execute(text(
+                    f"UPDATE {quote(table)} SET {quote(column)} = CASE {quote(column)} {cases} END "
+                    f"WHERE {quote(column)} IN ({names})"
+                ))
+        for type_name in legacy_types:
+            connection.execute(text(f"DROP TYPE IF EXISTS {quote(type_name)}"))
+
 # Database initialization function
 def init_db(database_url='sqlite:///crypto_analytics.db'):
     """Initialize the database and create all tables."""
-    engine = create_engine(database_url)
+    engine = create_db_engine(database_url)
     Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    create_missing_indexes(engine)
+    migrate_legacy_enums(engine)
+    Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+    return Session
\ No newline at end of file
@@ -1,25 +1,146 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Union, Tuple
 from sqlalchemy import String, create_engine, and_, desc, func
 from sqlalchemy.orm import sessionmaker, Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm.exc import DetachedInstanceError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import OrderedDict
 from contextlib import contextmanager
 import logging
+import threading
 from typing import List, Dict, Optional, Union, Tuple
-from .database import User, UserType, UserActivity, Admin, AdminActivity, Base, Coin, CoinPrice, OHLC, TrendingCoin
+from .database import User, UserType, UserActivity, Admin, AdminActivity, AdminTypes, Base, Coin, CoinPrice, OHLC, TrendingCoin, create_db_engine, create_missing_indexes, migrate_legacy_enums
 import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+
+class _LRUCache:
+    """Small in-process LRU cache for hot row lookups, keyed by telegram id."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        # Bumped on every invalidation, so a lookup that raced a write can tell
+        # its row may be stale and skip caching it
+        self._generation = 0
+        # Lookups may run on worker threads (asyncio.to_thread) as well as the event loop.
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def put(self, key, value, generation=None) -> None:
+        """Cache value, unless an invalidation happened since `generation` was read."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self._generation += 1
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+
+# Admin membership rarely changes: each cached lookup is served for
+# ADMIN_CACHE_USES reads before it is re-queried, and any admin write
+# clears the whole cache.
+ADMIN_CACHE_USES = 64
+
+
+class _AdminCache:
+    """In-process cache of admin lookups (including misses), keyed by user id."""
+
+    def __init__(self, uses: int = ADMIN_CACHE_USES):
+        self.uses = uses
+        self._data: Dict[str, Tuple[Optional[Dict], int]] = {}
+        # Bumped on every clear; see _LRUCache for why lookups check it before caching
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id: str):
+        """Return the cached admin row (or None) and spend one use, or _MISSING."""
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return _MISSING
+            admin, uses_left = entry
+            if uses_left > 1:
+                self._data[user_id] = (admin, uses_left - 1)
+            else:
+                del self._data[user_id]
+            return admin
+
+    def put(self, user_id: str, admin: Optional[Dict], generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._data[user_id] = (admin, self.uses)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+
+# One cache of each kind per database, shared by every DatabaseManager
+# pointing at it, so that a write through one handler's manager invalidates
+# the lookups cached by the others without leaking rows between databases.
+_user_caches: Dict[str, _LRUCache] = {}
+_admin_caches: Dict[str, _AdminCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_for(caches: Dict, engine, factory):
+    if engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:'):
+        # Every engine on a private in-memory database has a database of its own
+        return factory()
+    key = engine.url.render_as_string(hide_password=False)
+    with _caches_lock:
+        if key not in caches:
+            caches[key] = factory()
+        return caches[key]
+
 class DatabaseManager:
     def __init__(self, database_url: str = None):
         """Initialize database connection and session maker."""
         if database_url is None:
             database_url = self._construct_database_url()
-        self.engine = create_engine(database_url)
+        self.engine = create_db_engine(
+            database_url,
+            use_null_pool=os.getenv('USE_PGBOUNCER', '').lower() in ('1', 'true', 'yes'),
+        )
         Base.metadata.create_all(self.engine)
-        self.SessionMaker = sessionmaker(bind=self.engine)
+        # Objects stay loaded after commit, so returning them or cloning them
+        # into dicts does not trigger a fresh SELECT per attribute
+        self.SessionMaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._user_cache = _cache_for(_user_caches, self.engine, _LRUCache)
+        self._admin_cache = _cache_for(_admin_caches, self.engine, _AdminCache)
 
     def _construct_database_url(self) -> str:
         """Construct PostgreSQL database URL from environment variables, prioritizing DATABASE_URL."""
@@ -32,6 +153,8 @@ class DatabaseManager:
     def init_db(self) -> None:
         """Initialize the database and create all tables."""
         Base.metadata.create_all(self.engine)
+        create_missing_indexes(self.engine)
+        migrate_legacy_enums(self.engine)
 
     @contextmanager
     def session_scope(self) -> Session:
@@ -315,17 +438,33 @@ class DatabaseManager:
                 user = User(**user_data)
                 session.add(user)
                 session.flush()
-                return self._clone_object(user)
+                user = self._clone_object(user)
+            # Once committed, the new row is exactly what the next lookup would return
+            self._user_cache.put(str(user['telegram_id']), user)
+            return dict(user)
         except SQLAlchemyError as e:
             logger.error(f"Error creating user: {str(e)}")
             return None
 
+    def get_or_create_user(self, telegram_id: str) -> Optional[Dict]:
+        """Retrieve a user by Telegram ID, creating it on first contact."""
+        return self.get_user_by_telegram_id(telegram_id) or self.create_user({'telegram_id': str(telegram_id)})
+
     def get_user_by_telegram_id(self, telegram_id: str) -> Optional[Dict]:
         """Retrieve a user by their Telegram ID."""
+        telegram_id = str(telegram_id)
+        cached = self._user_cache.get(telegram_id)
+        if cached is not _MISSING:
+            return dict(cached)
+        generation = self._user_cache.generation()
         try:
             with self.session_scope() as session:
-                user = session.query(User).filter_by(telegram_id=str(telegram_id)).first()
-                return self._clone_object(user)
+                user = session.query(User).filter_by(telegram_id=telegram_id).first()
+                user = self._clone_object(user)
+            if user:
+                self._user_cache.put(telegram_id, user, generation)
+                return dict(user)
+            return None
         except SQLAlchemyError as e:
             logger.error(f"Error fetching user with telegram_id {telegram_id}: {str(e)}")
             return None
@@ -339,8 +478,8 @@ class DatabaseManager:
                     return None
 
                 old_type = user.user_type
-                user.user_type = new_type
-                user.last_active = datetime.utcnow()
+                user.user_type = UserType(new_type).value
+                user.last_active = datetime.now(timezone.utc)
 
                 # Log admin activity
                 admin_activity = AdminActivity(
@@ -348,13 +487,16 @@ class DatabaseManager:
                     activity_type="user_type_update",
                     target_user_id=user_id,
                     details={
-                        "old_type": old_type.value,
-                        "new_type": new_type.value
+                        "old_type": old_type,
+                        "new_type": user.user_type
                     }
                 )
                 session.add(admin_activity)
                 session.flush()
-                return self._clone_object(user)
+                user = self._clone_object(user)
+            # Invalidate only once the change is committed
+            self._user_cache.pop(str(user_id), None)
+            return user
         except SQLAlchemyError as e:
             logger.error(f"Error updating user type for user {user_id}: {str(e)}")
             return None
@@ -364,14 +506,11 @@ class DatabaseManager:
         """Update user's language."""
         try:
             with self.session_scope() as session:
-                user = session.query(User).filter_by(telegram_id=user_id).first()
-                if not user:
-                    return False
-
-                user.language = new_lang
-
-                session.flush()
-                return True
+                updated = session.query(User).filter_by(telegram_id=str(user_id)).update(
+                    {User.language: new_lang}, synchronize_session=False
+                )
+            self._user_cache.pop(str(user_id), None)
+            return updated > 0
         except SQLAlchemyError as e:
             logger.error(f"Error updating user language {user_id}: {str(e)}")
             return False
@@ -379,14 +518,11 @@ class DatabaseManager:
         """Update user's chart type."""
         try:
             with self.session_scope() as session:
-                user = session.query(User).filter_by(telegram_id=user_id).first()
-                if not user:
-                    return False
-
-                user.preferred_chart_type = new_preferred_chart_type
-
-                session.flush()
-                return True
+                updated = session.query(User).filter_by(telegram_id=str(user_id)).update(
+                    {User.preferred_chart_type: new_preferred_chart_type}, synchronize_session=False
+                )
+            self._user_cache.pop(str(user_id), None)
+            return updated > 0
         except SQLAlchemyError as e:
             logger.error(f"Error updating user preferred chart type {user_id}: {str(e)}")
             return False
@@ -394,14 +530,11 @@ class DatabaseManager:
         """Update user's chart type."""
         try:
             with self.session_scope() as session:
-                user = session.query(User).filter_by(telegram_id=user_id).first()
-                if not user:
-                    return False
-
-                user.preferred_timeframe = new_preferred_timeframe
-
-                session.flush()
-                return True
+                updated = session.query(User).filter_by(telegram_id=str(user_id)).update(
+                    {User.preferred_timeframe: new_preferred_timeframe}, synchronize_session=False
+                )
+            self._user_cache.pop(str(user_id), None)
+            return updated > 0
         except SQLAlchemyError as e:
             logger.error(f"Error updating user preferred chart type {user_id}: {str(e)}")
             return False
@@ -442,7 +575,7 @@ class DatabaseManager:
                     return None
                 admin = Admin(
                     user_id=admin_data['user_id'],
-                    role=admin_data['role'],
+                    role=AdminTypes(admin_data['role']).value,
                     created_by=admin_data.get('created_by')
                 )
                 session.add(admin)
@@ -456,12 +589,48 @@ class DatabaseManager:
                 # )
                 # session.add(activity)
                 
-                # session.flush()
-                return self._clone_object(admin)
+                # Flush so the returned dict carries the generated id and defaults
+                session.flush()
+                admin = self._clone_object(admin)
+            # Invalidate only once the change is committed
+            self._admin_cache.clear()
+            return admin
         except SQLAlchemyError as e:
             logger.error(f"Error creating admin: {str(e)}")
             return None
 
+    def _insert(self, table):
+        """Dialect-specific INSERT supporting ON CONFLICT DO NOTHING."""
+        if self.engine.dialect.name == 'sqlite':
+            return sqlite_insert(table)
+        return postgresql_insert(table)
+
+    def bootstrap_admins(self, usernames: List[str], created_by: str, role: AdminTypes = AdminTypes.MASTER) -> bool:
+        """
+        Idempotently ensure each username exists as a user and as an admin.
+        Runs two INSERT ... ON CONFLICT DO NOTHING statements in one transaction.
+        """
+        if not usernames:
+            return True
+        users = [{'telegram_id': name} for name in usernames]
+        role = AdminTypes(role).value
+        admin_rows = [{'user_id': name, 'role': role, 'created_by': created_by} for name in usernames]
+        try:
+            with self.session_scope() as session:
+                session.execute(
+                    self._insert(User).values(users).on_conflict_do_nothing(index_elements=['telegram_id'])
+                )
+                session.execute(
+                    self._insert(Admin).values(admin_rows).on_conflict_do_nothing(index_elements=['user_id'])
+                )
+            for name in usernames:
+                self._user_cache.pop(name, None)
+            self._admin_cache.clear()
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Error bootstrapping admins: {str(e)}")
+            return False
+
     def remove_admin(self, admin_id: str, removed_by: str) -> bool:
         """
         Permanently remove an admin record from the database.
@@ -487,25 +656,26 @@ class DatabaseManager:
                 session.delete(admin)
                 
                 session.flush()
-                return True
+            self._admin_cache.clear()
+            return True
         except SQLAlchemyError as e:
             logger.error(f"Error removing admin {admin_id}: {str(e)}")
             return False
  
     def get_admin_by_user_id(self, user_id: str) -> Optional[Dict]:
         """Get admin info by user ID if they are an admin."""
-        
+        user_id = str(user_id)
+        cached = self._admin_cache.get(user_id)
+        if cached is not _MISSING:
+            return dict(cached) if cached else None
+        generation = self._admin_cache.generation()
         try:
-            user = self.get_user_by_telegram_id(user_id)
-            if user:
-                with self.session_scope() as session:
-                    admin = session.query(Admin).filter_by(
-                        user_id=user.get('telegram_id'),
-                    ).first()
-                    return self._clone_object(admin)
-            else:
-                logger.error(f"Error fetching admin for user {user_id}")
-                return None    
+            # Admin.user_id references users.telegram_id, so no separate user lookup is needed
+            with self.session_scope() as session:
+                admin = session.query(Admin).filter_by(user_id=user_id).first()
+                admin = self._clone_object(admin)
+            self._admin_cache.put(user_id, admin, generation)
+            return dict(admin) if admin else None
         except SQLAlchemyError as e:
             logger.error(f"Error fetching admin for user {user_id}: {str(e)}")
             return None
@@ -598,7 +768,7 @@ class DatabaseManager:
                     return None
 
                 old_role = admin.role
-                admin.role = new_role
+                admin.role = AdminTypes(new_role).value
                 
                 # Log admin activity
                 admin_activity = AdminActivity(
@@ -606,13 +776,15 @@ class DatabaseManager:
                     activity_type="admin_role_change",
                     target_user_id=admin_id,
                     details={
-                        "old_role": old_role.value,
-                        "new_role": new_role.value
+                        "old_role": old_role,
+                        "new_role": admin.role
                     }
                 )
                 session.add(admin_activity)
                 session.flush()
-                return self._clone_object(admin)
+                admin = self._clone_object(admin)
+            self._admin_cache.clear()
+            return admin
         except SQLAlchemyError as e:
             logger.error(f"Error updating user role for admin {admin_id}: {str(e)}")
             return None
@@ -1,4 +1,5 @@
 from typing import Dict, List,Tuple
+from functools import lru_cache
 import json
 import os
 
@@ -19,6 +20,8 @@ class TelegramFormatter:
                 'en': self._load_language('en'),
                 'ar': self._load_language('ar')
             }
+            # Translation tables were (re)loaded, drop any memoized lookups
+            self._translate.cache_clear()
             self._initialized = True
             
     def _get_education_content(self, language:str, category:str):
@@ -48,12 +51,17 @@ class TelegramFormatter:
 
     def set_language(self, lang_code: str):
 
-        if lang_code in self.languages:
+        if lang_code != self.current_language and lang_code in self.languages:
             self.current_language = lang_code
 
+    @lru_cache(maxsize=1024)
+    def _translate(self, lang_code: str, key: str) -> str:
+        """Memoized translation lookup for an explicit language"""
+        return self.languages[lang_code].get(key)
+
     def _t(self, key: str) -> str:
         """Get translation for key"""
-        return self.languages[self.current_language].get(key)
+        return self._translate(self.current_language, key)
 
     def format_full_analysis(self, analysis: Dict, coin_id: str) -> str:
         """Format comprehensive analysis results"""
@@ -0,0 +1,11 @@
+# src/utils/helpers.py
+
+
+def get_telegram_id(user) -> str:
+    """
+    Get the id users are stored under: the Telegram username, or the numeric
+    Telegram id for accounts without a username (instead of the string "None").
+    """
+    if user.username is None:
+        return str(user.id)
+    return str(user.username)
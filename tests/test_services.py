@@ -0,0 +1,237 @@
+import os
+import sys
+import enum
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table,
+    UniqueConstraint, create_engine, text,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.database import ADMIN_MASTER, ADMIN_NORMAL, USER_BANNED
+from src.services.database_manager import DatabaseManager, _LRUCache
+
+
+class UserCacheTest(unittest.TestCase):
+    """Tests for the in-process user lookup cache in DatabaseManager."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.managers = []
+        self.db = self._manager('users.db')
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _manager(self, filename):
+        manager = DatabaseManager(f"sqlite:///{os.path.join(self.tmp_dir.name, filename)}")
+        manager.init_db()
+        self.managers.append(manager)
+        return manager
+
+    def _delete_row_behind_cache(self, manager, telegram_id):
+        """Remove a user with raw SQL so only a cache hit can still return it."""
+        with manager.engine.begin() as connection:
+            connection.execute(text("DELETE FROM users WHERE telegram_id = :id"), {'id': telegram_id})
+
+    def test_lookup_hit_is_served_from_cache(self):
+        self.db.create_user({'telegram_id': 'alice'})
+        self._delete_row_behind_cache(self.db, 'alice')
+        self.assertEqual(self.db.get_user_by_telegram_id('alice')['telegram_id'], 'alice')
+
+    def test_lookup_miss_reads_database_and_is_not_cached(self):
+        self.assertIsNone(self.db.get_user_by_telegram_id('nobody'))
+        self.db.create_user({'telegram_id': 'nobody'})
+        self.assertEqual(self.db.get_user_by_telegram_id('nobody')['telegram_id'], 'nobody')
+
+    def test_create_user_populates_cache(self):
+        created = self.db.create_user({'telegram_id': 'bob'})
+        self._delete_row_behind_cache(self.db, 'bob')
+        self.assertEqual(self.db.get_user_by_telegram_id('bob'), created)
+
+    def test_returned_rows_are_copies(self):
+        self.db.create_user({'telegram_id': 'carol'})
+        self.db.get_user_by_telegram_id('carol')['language'] = 'xx'
+        self.assertEqual(self.db.get_user_by_telegram_id('carol')['language'], 'en')
+
+    def test_update_methods_evict_cached_user(self):
+        self.db.create_user({'telegram_id': 'dave'})
+        self.db.create_user({'telegram_id': 'admin'})
+        updates = (
+            (lambda: self.db.update_user_type('dave', 'premium', 'admin'), 'user_type', 'premium'),
+            (lambda: self.db.update_user_language('dave', 'ar'), 'language', 'ar'),
+            (lambda: self.db.update_user_chart_type('dave', 'macd'), 'preferred_chart_type', 'macd'),
+            (lambda: self.db.update_user_timeframe('dave', 7), 'preferred_timeframe', 7),
+        )
+        for update, field, expected in updates:
+            with self.subTest(field=field):
+                self.db.get_user_by_telegram_id('dave')  # make sure the row is cached
+                self.assertTrue(update())
+                self.assertEqual(self.db.get_user_by_telegram_id('dave')[field], expected)
+
+    def test_update_is_visible_through_another_manager(self):
+        other = DatabaseManager(str(self.db.engine.url))
+        self.managers.append(other)
+        self.db.create_user({'telegram_id': 'erin'})
+        other.get_user_by_telegram_id('erin')
+        self.db.update_user_language('erin', 'ar')
+        self.assertEqual(other.get_user_by_telegram_id('erin')['language'], 'ar')
+
+    def test_managers_on_different_databases_do_not_share_rows(self):
+        other = self._manager('other.db')
+        self.db.create_user({'telegram_id': 'zed', 'user_type': 'banned'})
+        self.assertIsNone(other.get_user_by_telegram_id('zed'))
+
+    def test_stale_fill_after_invalidation_is_dropped(self):
+        cache = _LRUCache()
+        generation = cache.generation()
+        cache.pop('frank')  # a write commits while the lookup is in flight
+        cache.put('frank', {'telegram_id': 'frank'}, generation)
+        self.assertIsNone(cache.get('frank', None))
+        cache.put('frank', {'telegram_id': 'frank'}, cache.generation())
+        self.assertEqual(cache.get('frank', None), {'telegram_id': 'frank'})
+
+
+class AdminCacheTest(unittest.TestCase):
+    """Tests for the in-process admin lookup cache in DatabaseManager."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.managers = []
+        self.db = self._manager('admins.db')
+        self.db.create_user({'telegram_id': 'root'})
+        self.db.create_admin({'user_id': 'root', 'role': ADMIN_MASTER})
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _manager(self, filename):
+        manager = DatabaseManager(f"sqlite:///{os.path.join(self.tmp_dir.name, filename)}")
+        manager.init_db()
+        self.managers.append(manager)
+        return manager
+
+    def test_update_is_visible_through_another_manager(self):
+        other = DatabaseManager(str(self.db.engine.url))
+        self.managers.append(other)
+        self.assertEqual(other.get_admin_by_user_id('root')['role'], ADMIN_MASTER)
+        self.assertTrue(self.db.update_admin_role('root', ADMIN_NORMAL, 'root'))
+        self.assertEqual(other.get_admin_by_user_id('root')['role'], ADMIN_NORMAL)
+
+    def test_managers_on_different_databases_do_not_share_admins(self):
+        other = self._manager('other.db')
+        self.assertIsNotNone(self.db.get_admin_by_user_id('root'))
+        self.assertIsNone(other.get_admin_by_user_id('root'))
+
+
+class InMemoryDatabaseTest(unittest.TestCase):
+    """Tests for DatabaseManager on sqlite:// URLs."""
+
+    def setUp(self):
+        self.db = DatabaseManager('sqlite://')
+        self.db.init_db()
+
+    def tearDown(self):
+        self.db.engine.dispose()
+
+    def test_rows_are_visible_from_other_threads(self):
+        self.db.create_user({'telegram_id': 'grace'})
+        self.db.update_user_language('grace', 'ar')  # evicts the row, so the read hits the database
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(self.db.get_user_by_telegram_id('grace'))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(results[0]['language'], 'ar')
+
+    def test_managers_do_not_share_cached_rows(self):
+        other = DatabaseManager('sqlite://')
+        self.addCleanup(other.engine.dispose)
+        self.db.create_user({'telegram_id': 'heidi'})
+        self.assertIsNone(other.get_user_by_telegram_id('heidi'))
+
+
+class LegacyEnumMigrationTest(unittest.TestCase):
+    """Tests for init_db() on a database created with the old Enum columns."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.tmp_dir.name, 'legacy.db')}"
+        self._create_legacy_database()
+        self.db = DatabaseManager(self.url)
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _create_legacy_database(self):
+        """Build the baseline tables, where Enum columns stored member names."""
+        UserType = enum.Enum('UserType', {'GUEST': 'guest', 'PREMIUM': 'premium', 'BANNED': 'banned'})
+        AdminTypes = enum.Enum('AdminTypes', {'MASTER': 'master', 'NORMAL': 'normal', 'WATCHER': 'watcher'})
+        TimeInterval = enum.Enum('TimeInterval', {'ONE_DAY': 1, 'SEVEN_DAYS': 7, 'THIRTY_DAYS': 30, 'NINETY_DAYS': 90})
+        metadata = MetaData()
+        Table('coins', metadata,
+              Column('id', String, primary_key=True),
+              Column('symbol', String, nullable=False),
+              Column('name', String, nullable=False),
+              Column('platforms', JSON),
+              Column('extra_data', JSON),
+              Column('last_updated', DateTime))
+        Table('users', metadata,
+              Column('id', Integer, primary_key=True),
+              Column('telegram_id', String, unique=True, nullable=False),
+              Column('username', String),
+              Column('user_type', Enum(UserType), nullable=False),
+              Column('created_at', DateTime),
+              Column('last_active', DateTime),
+              Column('language', String),
+              Column('preferred_chart_type', String),
+              Column('preferred_timeframe', Integer))
+        Table('admins', metadata,
+              Column('id', Integer, primary_key=True),
+              Column('user_id', String, ForeignKey('users.telegram_id'), unique=True, nullable=False),
+              Column('role', Enum(AdminTypes), nullable=False),
+              Column('created_at', DateTime),
+              Column('created_by', String, ForeignKey('admins.user_id')),
+              Column('is_active', Boolean))
+        Table('ohlc', metadata,
+              Column('id', Integer, primary_key=True),
+              Column('coin_id', String, ForeignKey('coins.id'), nullable=False),
+              Column('vs_currency', String, nullable=False),
+              Column('interval', Enum(TimeInterval), nullable=False),
+              Column('timestamp', DateTime, nullable=False),
+              *(Column(name, Float) for name in ('open', 'high', 'low', 'close', 'volume', 'market_cap')),
+              Column('last_updated', DateTime),
+              UniqueConstraint('coin_id', 'timestamp', name='unique_coin_timestamp'))
+        engine = create_engine(self.url)
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO coins (id, symbol, name) VALUES ('bitcoin', 'btc', 'Bitcoin')"))
+            connection.execute(text("INSERT INTO users (telegram_id, user_type, language) VALUES ('mallory', 'BANNED', 'en')"))
+            connection.execute(text("INSERT INTO admins (user_id, role, is_active) VALUES ('mallory', 'MASTER', 1)"))
+            connection.execute(text(
+                "INSERT INTO ohlc (coin_id, vs_currency, interval, timestamp) "
+                "VALUES ('bitcoin', 'usd', 'ONE_DAY', '2024-01-01 00:00:00.000000')"
+            ))
+        engine.dispose()
+
+    def test_init_db_rewrites_enum_names_to_values(self):
+        self.db.init_db()
+        self.assertEqual(self.db.get_user_by_telegram_id('mallory')['user_type'], USER_BANNED)
+        self.assertEqual(self.db.get_admin_by_user_id('mallory')['role'], ADMIN_MASTER)
+        ohlc = self.db.get_ohlc_data('bitcoin', datetime(2023, 12, 31), datetime(2024, 1, 2))
+        self.assertEqual([row['interval'] for row in ohlc], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()